@@ -3,34 +3,57 @@ FastAPI main application for NYC Taxi Fare Prediction.
 """
 
 import logging
-from datetime import datetime
-from fastapi import FastAPI, HTTPException, Request
+import os
+import secrets
+import sys
+import time
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from anyio import to_thread
+from pydantic import TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
+import numpy as np
 import uvicorn
 
 from .models import (
     PredictionRequest, 
     PredictionResponse, 
+    BatchPredictionRequest,
+    BatchPredictionResponse,
     HealthResponse, 
     ErrorResponse
 )
-from .prediction import get_predictor
-from .utils import setup_logging, validate_nyc_coordinates
+from .prediction import get_predictor, reload_predictor
+from .utils import get_current_timestamp, setup_logging, validate_nyc_coordinates
 
 # Setup logging
 logger = setup_logging()
 
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Built once at import; /predict validates raw JSON bodies with it
+_PREDICTION_REQUEST_ADAPTER = TypeAdapter(PredictionRequest)
+
 # Create FastAPI application
 app = FastAPI(
     title="NYC Taxi Fare Predictor API",
     description="A machine learning API for predicting NYC taxi fares using enhanced ensemble models",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware for local development
+# Compress larger responses (/predict features, /model-info feature list)
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Add CORS middleware for local development (added last so it is outermost
+# and answers preflight requests before compression)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],  # Vite default ports
@@ -39,8 +62,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global predictor instance
-predictor = None
+# Global predictor instance. Loaded at import time so that `gunicorn --preload`
+# loads the model once in the master process and workers share its pages
+# copy-on-write; startup_event retries (and fails loudly) if this did not work.
+try:
+    predictor = get_predictor()
+except Exception as e:
+    logger.error(f"Failed to preload predictor: {e}")
+    predictor = None
 
 
 @app.on_event("startup")
@@ -51,6 +80,18 @@ async def startup_event():
         logger.info("Initializing taxi fare predictor...")
         predictor = get_predictor()
         logger.info("Taxi fare predictor initialized successfully")
+        
+        # Warm up sklearn/ONNX first-call paths so the first real request doesn't pay for them
+        warmup_start = time.perf_counter()
+        predictor.predict_fare(
+            pickup_lon=-73.99, pickup_lat=40.75,
+            dropoff_lon=-73.98, dropoff_lat=40.76,
+            passenger_count=1
+        )
+        logger.info(f"Warm-up prediction took {(time.perf_counter() - warmup_start) * 1000:.1f} ms")
+        
+        # Allow more concurrent predictions in the threadpool (default is 40)
+        to_thread.current_default_thread_limiter().total_tokens = 64
     except Exception as e:
         logger.error(f"Failed to initialize predictor: {e}")
         raise
@@ -60,7 +101,7 @@ async def startup_event():
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler."""
     logger.error(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "InternalServerError",
@@ -78,7 +119,8 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
-        "predict": "/predict"
+        "predict": "/predict",
+        "predict_batch": "/predict_batch"
     }
 
 
@@ -89,27 +131,49 @@ async def health_check():
     
     model_loaded = predictor is not None and predictor.is_loaded
     
-    return HealthResponse(
+    return HealthResponse.model_construct(
         status="healthy" if model_loaded else "unhealthy",
         version="1.0.0",
         model_loaded=model_loaded,
-        timestamp=datetime.now().isoformat()
+        timestamp=get_current_timestamp()
     )
 
 
-@app.post("/predict", response_model=PredictionResponse)
-async def predict_fare(request: PredictionRequest):
+@app.post(
+    "/predict",
+    responses={200: {"model": PredictionResponse}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": PredictionRequest.model_json_schema()}}
+        }
+    }
+)
+async def predict_fare(request: Request):
     """
     Predict taxi fare for a given trip.
     
+    The body is validated with a prebuilt TypeAdapter and the model call runs in
+    the threadpool; the trusted result is serialized directly, bypassing
+    FastAPI's dependency injection and response-model validation.
+    
     Args:
-        request: Trip details including pickup/dropoff coordinates and passenger count
+        request: Raw request whose JSON body holds the trip details
+            (pickup/dropoff coordinates and passenger count)
     
     Returns:
         Prediction response with fare estimate, confidence, and details
     """
     global predictor
     
+    try:
+        trip = _PREDICTION_REQUEST_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        # Same 422 shape FastAPI produces for body parameters
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+    
     if predictor is None or not predictor.is_loaded:
         raise HTTPException(
             status_code=503,
@@ -121,47 +185,18 @@ async def predict_fare(request: PredictionRequest):
         )
     
     try:
-        # Additional validation
-        if not validate_nyc_coordinates(request.pickup_latitude, request.pickup_longitude):
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "ValidationError",
-                    "message": "Pickup coordinates are outside NYC bounds",
-                    "details": {
-                        "pickup_lat": request.pickup_latitude,
-                        "pickup_lon": request.pickup_longitude,
-                        "valid_lat_range": "(40.63, 40.85)",
-                        "valid_lon_range": "(-74.05, -73.75)"
-                    }
-                }
-            )
-        
-        if not validate_nyc_coordinates(request.dropoff_latitude, request.dropoff_longitude):
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "ValidationError",
-                    "message": "Dropoff coordinates are outside NYC bounds",
-                    "details": {
-                        "dropoff_lat": request.dropoff_latitude,
-                        "dropoff_lon": request.dropoff_longitude,
-                        "valid_lat_range": "(40.63, 40.85)",
-                        "valid_lon_range": "(-74.05, -73.75)"
-                    }
-                }
-            )
-        
         # Make prediction
-        result = predictor.predict_fare(
-            pickup_lon=request.pickup_longitude,
-            pickup_lat=request.pickup_latitude,
-            dropoff_lon=request.dropoff_longitude,
-            dropoff_lat=request.dropoff_latitude,
-            passenger_count=request.passenger_count
+        result = await run_in_threadpool(
+            predictor.predict_fare,
+            pickup_lon=trip.pickup_longitude,
+            pickup_lat=trip.pickup_latitude,
+            dropoff_lon=trip.dropoff_longitude,
+            dropoff_lat=trip.dropoff_latitude,
+            passenger_count=trip.passenger_count
         )
         
-        return PredictionResponse(**result)
+        # The result dict is built by the predictor itself, so skip re-validation
+        return ORJSONResponse(result)
         
     except HTTPException:
         raise
@@ -177,6 +212,59 @@ async def predict_fare(request: PredictionRequest):
         )
 
 
+@app.post("/predict_batch", response_model=BatchPredictionResponse)
+def predict_fare_batch(request: BatchPredictionRequest):
+    """
+    Predict taxi fares for up to 1000 trips in one model call.
+    
+    Args:
+        request: List of trips, each with the same fields as /predict
+    
+    Returns:
+        Predictions in the same order as the requested trips
+    """
+    global predictor
+    
+    if predictor is None or not predictor.is_loaded:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "ServiceUnavailable",
+                "message": "ML model not loaded",
+                "details": {"model_loaded": False}
+            }
+        )
+    
+    try:
+        trips = np.array(
+            [
+                (
+                    trip.pickup_longitude, trip.pickup_latitude,
+                    trip.dropoff_longitude, trip.dropoff_latitude,
+                    trip.passenger_count
+                )
+                for trip in request.trips
+            ],
+            dtype=np.float64
+        )
+        results = predictor.predict_batch(trips)
+        
+        return BatchPredictionResponse.model_construct(
+            predictions=[PredictionResponse.model_construct(**result) for result in results]
+        )
+        
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "PredictionError",
+                "message": "Failed to generate batch prediction",
+                "details": {"error_type": type(e).__name__, "error_message": str(e)}
+            }
+        )
+
+
 @app.get("/model-info")
 async def get_model_info():
     """Get information about the loaded ML model."""
@@ -188,6 +276,67 @@ async def get_model_info():
     return predictor.get_model_info()
 
 
+def _require_admin(x_admin_token: Optional[str]):
+    """Reject the request unless admin endpoints are enabled and the token matches."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=403,
+            detail={
+                "error": "Forbidden",
+                "message": "Invalid or missing admin token",
+                "details": None
+            }
+        )
+
+
+@app.post("/cache/clear", include_in_schema=False)
+async def clear_cache(x_admin_token: Optional[str] = Header(None)):
+    """
+    Clear the prediction cache.
+    
+    Admin only: requires ADMIN_TOKEN to be set and sent as the X-Admin-Token header.
+    """
+    global predictor
+    
+    _require_admin(x_admin_token)
+    
+    if predictor is None:
+        return {"cleared": False, "error": "Predictor not initialized"}
+    
+    return {"cleared": True, **predictor.clear_prediction_cache()}
+
+
+@app.post("/model/reload", include_in_schema=False)
+def reload_model(x_admin_token: Optional[str] = Header(None)):
+    """
+    Reload the model files from disk (e.g. after swapping them).
+    
+    Admin only, like /cache/clear. The new model is loaded alongside the old one
+    and swapped in whole; requests already running finish on the old model.
+    Only the worker process that serves this request is reloaded.
+    """
+    global predictor
+    
+    _require_admin(x_admin_token)
+    
+    try:
+        predictor = reload_predictor()
+    except Exception as e:
+        logger.error(f"Model reload failed: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "ReloadError",
+                "message": "Failed to reload the ML model",
+                "details": {"error_type": type(e).__name__, "error_message": str(e)}
+            }
+        )
+    
+    return {"reloaded": True, "model_loaded": predictor.is_loaded}
+
+
 @app.get("/validate-coordinates")
 async def validate_coordinates(lat: float, lon: float):
     """Validate if coordinates are within NYC bounds."""
@@ -206,10 +355,16 @@ async def validate_coordinates(lat: float, lon: float):
 
 # For development testing
 if __name__ == "__main__":
+    # Reload only works with a single worker; otherwise run one process per core
+    reload = os.getenv("RELOAD", "0") == "1"
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        reload=reload,
+        workers=1 if reload else int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        log_level="info",
+        # uvloop has no Windows build; fall back to the stdlib loop there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     )
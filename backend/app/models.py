@@ -2,8 +2,8 @@
 Pydantic models for API request/response validation.
 """
 
-from typing import Optional
-from pydantic import BaseModel, Field, validator
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class PredictionRequest(BaseModel):
@@ -39,20 +39,6 @@ class PredictionRequest(BaseModel):
         le=6,
         description="Number of passengers (1-6)"
     )
-    
-    @validator('pickup_longitude', 'dropoff_longitude')
-    def validate_longitude(cls, v):
-        """Validate longitude is within NYC bounds."""
-        if not (-74.05 <= v <= -73.75):
-            raise ValueError('Longitude must be within NYC bounds (-74.05 to -73.75)')
-        return v
-    
-    @validator('pickup_latitude', 'dropoff_latitude')
-    def validate_latitude(cls, v):
-        """Validate latitude is within NYC bounds."""
-        if not (40.63 <= v <= 40.85):
-            raise ValueError('Latitude must be within NYC bounds (40.63 to 40.85)')
-        return v
 
 
 class PredictionResponse(BaseModel):
@@ -84,6 +70,25 @@ class PredictionResponse(BaseModel):
         }
 
 
+class BatchPredictionRequest(BaseModel):
+    """Request model for predicting several trips in one call."""
+    
+    trips: List[PredictionRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="Trips to predict (1-1000)"
+    )
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response model for batch taxi fare prediction."""
+    
+    predictions: List[PredictionResponse] = Field(
+        ..., description="Predictions in the same order as the requested trips"
+    )
+
+
 class HealthResponse(BaseModel):
     """Health check response model."""
     
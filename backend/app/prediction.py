@@ -4,28 +4,38 @@ Machine learning prediction logic for taxi fare estimation.
 
 import os
 import sys
+import math
 import joblib
 import json
 import logging
+import threading
 import time
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
-import pandas as pd
 import numpy as np
 from pathlib import Path
 
+try:
+    import onnxruntime as ort
+except ImportError:  # ONNX inference is optional; fall back to the sklearn model
+    ort = None
+
 # Add models directory to path
 MODELS_DIR = Path(__file__).parent.parent / "models"
 sys.path.append(str(MODELS_DIR))
 
+from model_utils import ignore_feature_name_warnings
+
 from .utils import (
-    calculate_haversine_distance,
-    calculate_manhattan_distance,
-    calculate_trip_features,
     calculate_fare_confidence,
-    format_prediction_details,
+    get_current_timestamp,
     setup_logging
 )
+from .utils_numba import (
+    KERNEL_FEATURES, build_and_scale, prepare_features_batch, prepare_features_row,
+    warmup as warmup_feature_kernel
+)
 
 logger = setup_logging()
 
@@ -33,16 +43,48 @@ logger = setup_logging()
 class TaxiFarePredictor:
     """Enhanced taxi fare predictor using the model from Task_4_3_2."""
     
+    # Simplified borough boxes as [lon_min, lon_max, lat_min, lat_max], checked in order
+    BOROUGH_BOUNDS = np.array([
+        [-74.02, -73.93, 40.70, 40.80],  # Manhattan
+        [-74.05, -73.85, 40.63, 40.72],  # Brooklyn
+        [-73.96, -73.75, 40.72, 40.80],  # Queens
+        [-73.93, -73.80, 40.80, 40.88],  # Bronx
+    ])
+    BOROUGH_NAMES = ("Manhattan", "Brooklyn", "Queens", "Bronx", "Staten Island")
+    # Borough lookup grid over lat 40.5-40.9, lon -74.3 to -73.7 at 0.01° cells
+    BOROUGH_LUT_ORIGIN = (40.5, -74.3)
+    BOROUGH_LUT_CELLS_PER_DEGREE = 100
+    BOROUGH_LUT_SHAPE = (40, 60)
+    
+    # Coordinates are quantized to this many decimals (~11 m) before prediction
+    COORDINATE_DECIMALS = 4
+    
     def __init__(self):
         """Initialize the predictor with model and scaler."""
         self.model = None
+        self.onnx_session = None
         self.scaler = None
         self.model_config = None
         self.feature_names = None
         self.is_loaded = False
         
+        self._borough_lut = self._build_borough_lut()
+        
+        # Temporal features for the current clock hour, refreshed when it ends
+        self._temporal = None
+        self._temporal_expires = 0.0
+        
+        # Per-thread (1, n_features) raw and scaled rows reused by _prepare_features
+        self._local = threading.local()
+        
         # Load model components
         self._load_model_components()
+        
+        # Prediction cache keyed on quantized coordinates + hour (see predict_fare)
+        self._pred_cache = lru_cache(maxsize=10_000)(self._predict_fare_uncached)
+        
+        # Compile the feature kernel now rather than on the first request
+        warmup_feature_kernel()
     
     def _load_model_components(self):
         """Load the trained model, scaler, and configuration."""
@@ -52,11 +94,49 @@ class TaxiFarePredictor:
             self.model = joblib.load(model_path)
             logger.info(f"Model loaded successfully from {model_path}")
             
+            # Requests already run in parallel threads; keep each predict single-threaded
+            if hasattr(self.model, 'n_jobs'):
+                self.model.n_jobs = 1
+            
+            # Resolve the ensemble shape once instead of on every prediction
+            self._is_ensemble = hasattr(self.model, 'estimators_')
+            # First 5 estimators feed the confidence estimate; keep their raw trees when available
+            self._confidence_estimators = list(self.model.estimators_[:5]) if self._is_ensemble else []
+            self._trees = None
+            if self._confidence_estimators and all(
+                hasattr(estimator, 'tree_') for estimator in self._confidence_estimators
+            ):
+                self._trees = [estimator.tree_ for estimator in self._confidence_estimators]
+            
+            # Prefer the ONNX export of the model when it and onnxruntime are available
+            onnx_path = MODELS_DIR / "best_taxi_fare_model.onnx"
+            if ort is not None and onnx_path.exists():
+                sess_options = ort.SessionOptions()
+                sess_options.intra_op_num_threads = 1
+                sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self.onnx_session = ort.InferenceSession(
+                    str(onnx_path), sess_options=sess_options, providers=['CPUExecutionProvider']
+                )
+                self._onnx_input_name = self.onnx_session.get_inputs()[0].name
+                logger.info(f"ONNX model loaded successfully from {onnx_path}")
+            
             # Load scaler
             scaler_path = MODELS_DIR / "robust_scaler.pkl"
             self.scaler = joblib.load(scaler_path)
             logger.info(f"Scaler loaded successfully from {scaler_path}")
             
+            # Match the float32 feature rows so transform() stays in float32
+            for attr in ('center_', 'mean_', 'scale_'):
+                value = getattr(self.scaler, attr, None)
+                if isinstance(value, np.ndarray):
+                    setattr(self.scaler, attr, value.astype(np.float32))
+            
+            # (x - center) / scale parameters for the fused single-trip kernel
+            self._scale_params = self._fused_scale_params(self.scaler)
+            
+            # Inputs are plain ndarrays in web_app_features order
+            ignore_feature_name_warnings()
+            
             # Load model configuration
             config_path = MODELS_DIR / "model_config.json"
             with open(config_path, 'r') as f:
@@ -67,6 +147,12 @@ class TaxiFarePredictor:
             self.feature_names = self.config.get('web_app_features', [])
             logger.info(f"Loaded {len(self.feature_names)} features: {self.feature_names}")
             
+            # Column index of each feature in the model input
+            self._feature_index = {name: i for i, name in enumerate(self.feature_names)}
+            self._kernel_cols = np.array(
+                [self._feature_index[name] for name in KERNEL_FEATURES], dtype=np.int64
+            )
+            
             self.is_loaded = True
             logger.info("All model components loaded successfully")
             
@@ -79,10 +165,10 @@ class TaxiFarePredictor:
         self, 
         pickup_lon: float, pickup_lat: float,
         dropoff_lon: float, dropoff_lat: float,
-        passenger_count: int = 1
-    ) -> pd.DataFrame:
+        passenger_count: int, temporal: Tuple[int, int, int, int, int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Prepare features for prediction matching the exact training feature set.
+        Prepare (1, n_features) float32 raw and scaled rows matching the exact training feature set.
         Expected features from model_config.json:
         - pickup_longitude, pickup_latitude, dropoff_longitude, dropoff_latitude, passenger_count
         - hour, day, month, weekday, year
@@ -90,100 +176,96 @@ class TaxiFarePredictor:
         - is_weekend, is_rush_hour, is_night
         - manhattan_pickup_dist, is_manhattan_pickup, is_manhattan_dropoff
         - log_distance
+        
+        ``temporal`` is the (hour, day, month, weekday, year) tuple from
+        ``_get_temporal_features``.
         """
-        from datetime import datetime
-        
-        # Get current time for temporal features (use defaults for consistent prediction)
-        now = datetime.now()
-        hour = now.hour
-        day = now.day
-        month = now.month
-        weekday = now.weekday()  # 0=Monday, 6=Sunday
-        year = now.year
-        
-        # Calculate distances - ensure float64 type consistency
-        distance = float(calculate_haversine_distance(pickup_lat, pickup_lon, dropoff_lat, dropoff_lon))
-        
-        # Airport coordinates
-        jfk_lat, jfk_lon = 40.6413, -73.7781
-        ewr_lat, ewr_lon = 40.6895, -74.1745
-        lga_lat, lga_lon = 40.7769, -73.8740
-        
-        jfk_pickup_dist = float(calculate_haversine_distance(pickup_lat, pickup_lon, jfk_lat, jfk_lon))
-        ewr_pickup_dist = float(calculate_haversine_distance(pickup_lat, pickup_lon, ewr_lat, ewr_lon))
-        lga_pickup_dist = float(calculate_haversine_distance(pickup_lat, pickup_lon, lga_lat, lga_lon))
-        
-        # Manhattan center for distance calculation
-        manhattan_center_lat, manhattan_center_lon = 40.7589, -73.9851
-        manhattan_pickup_dist = float(calculate_haversine_distance(pickup_lat, pickup_lon, manhattan_center_lat, manhattan_center_lon))
-        
-        # Boolean features - convert to int for consistency
-        is_weekend = int(weekday >= 5)  # Saturday=5, Sunday=6
-        is_rush_hour = int((7 <= hour <= 9) or (17 <= hour <= 19))
-        is_night = int(hour >= 22 or hour <= 5)
-        
-        # Manhattan bounds (approximate)
-        manhattan_lat_min, manhattan_lat_max = 40.7000, 40.8000
-        manhattan_lon_min, manhattan_lon_max = -74.0200, -73.9300
-        
-        is_manhattan_pickup = int(manhattan_lat_min <= pickup_lat <= manhattan_lat_max and 
-                                 manhattan_lon_min <= pickup_lon <= manhattan_lon_max)
-        is_manhattan_dropoff = int(manhattan_lat_min <= dropoff_lat <= manhattan_lat_max and 
-                                  manhattan_lon_min <= dropoff_lon <= manhattan_lon_max)
-        
-        # Log distance (add small epsilon to avoid log(0))
-        log_distance = float(np.log(max(distance, 0.01)))
-        
-        # Create feature dictionary in the exact order expected by the model
-        # Ensure all values are proper Python types (not numpy types)
-        features = {
-            'pickup_longitude': float(pickup_lon),
-            'pickup_latitude': float(pickup_lat),
-            'dropoff_longitude': float(dropoff_lon),
-            'dropoff_latitude': float(dropoff_lat),
-            'passenger_count': int(passenger_count),
-            'hour': int(hour),
-            'day': int(day),
-            'month': int(month),
-            'weekday': int(weekday),
-            'year': int(year),
-            'distance': distance,
-            'jfk_pickup_dist': jfk_pickup_dist,
-            'ewr_pickup_dist': ewr_pickup_dist,
-            'lga_pickup_dist': lga_pickup_dist,
-            'is_weekend': is_weekend,
-            'is_rush_hour': is_rush_hour,
-            'is_night': is_night,
-            'manhattan_pickup_dist': manhattan_pickup_dist,
-            'is_manhattan_pickup': is_manhattan_pickup,
-            'is_manhattan_dropoff': is_manhattan_dropoff,
-            'log_distance': log_distance
-        }
+        hour, day, month, weekday, year = temporal
         
-        # Create DataFrame with features in the exact order from model config
-        expected_features = self.config.get('web_app_features', [])
-        if expected_features:
-            # Create DataFrame with only the expected features in the right order
-            ordered_features = {feat: features[feat] for feat in expected_features if feat in features}
-            df = pd.DataFrame([ordered_features])
-        else:
-            df = pd.DataFrame([features])
+        # Compute every feature straight into the model input row. Tree models
+        # evaluate splits in float32 anyway, so build the row at that precision.
+        features, features_scaled = self._feature_buffers()
         
-        # Ensure consistent data types - convert all to float64 for sklearn compatibility
-        df = df.astype('float64')
+        if self._scale_params is None:
+            prepare_features_row(
+                features[0], self._kernel_cols,
+                float(pickup_lon), float(pickup_lat), float(dropoff_lon), float(dropoff_lat),
+                int(passenger_count), hour, day, month, weekday, year
+            )
+            return features, self.scaler.transform(features)
         
-        logger.debug(f"Prepared features: {list(df.columns)}")
-        logger.debug(f"Feature values: {df.iloc[0].to_dict()}")
-        logger.debug(f"DataFrame shape: {df.shape}")
-        logger.debug(f"DataFrame dtypes: {df.dtypes.to_dict()}")
+        center, scale = self._scale_params
+        build_and_scale(
+            features[0], features_scaled[0], self._kernel_cols, center, scale,
+            float(pickup_lon), float(pickup_lat), float(dropoff_lon), float(dropoff_lat),
+            int(passenger_count), hour, day, month, weekday, year
+        )
+        return features, features_scaled
+    
+    def _feature_buffers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return this thread's reusable (1, n_features) float32 raw and scaled rows.
         
-        return df
+        Requests run concurrently in the threadpool, so each thread gets its own
+        buffers. Callers must not let them escape: only plain floats and lists
+        read from them end up in results.
+        """
+        buffers = getattr(self._local, "features", None)
+        if buffers is None or buffers[0].shape[1] != len(self.feature_names):
+            # C order: both the scaler and the tree predictors want row-contiguous input
+            buffers = (
+                np.empty((1, len(self.feature_names)), dtype=np.float32),
+                np.empty((1, len(self.feature_names)), dtype=np.float32)
+            )
+            self._local.features = buffers
+        return buffers
     
-    def _calculate_distance_to_center(self, lat: float, lon: float) -> float:
-        """Calculate distance to NYC center (Times Square: 40.7580, -73.9855)."""
-        center_lat, center_lon = 40.7580, -73.9855
-        from .utils import calculate_haversine_distance
-        return calculate_haversine_distance(lat, lon, center_lat, center_lon)
+    @staticmethod
+    def _fused_scale_params(scaler) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Extract float32 (center, scale) arrays equivalent to ``scaler.transform``.
+        
+        Handles RobustScaler (``center_``) and StandardScaler (``mean_``); returns
+        None for anything else so callers fall back to ``scaler.transform``.
+        """
+        if not hasattr(scaler, 'scale_') or not hasattr(scaler, 'n_features_in_'):
+            return None
+        if hasattr(scaler, 'center_'):
+            center = scaler.center_
+        elif hasattr(scaler, 'mean_'):
+            center = scaler.mean_
+        else:
+            return None
+        
+        # transform() skips centering when disabled, even if the center was stored
+        if not getattr(scaler, 'with_centering', getattr(scaler, 'with_mean', True)):
+            center = None
+        
+        n_features = scaler.n_features_in_
+        center = np.zeros(n_features) if center is None else center
+        scale = np.ones(n_features) if scaler.scale_ is None else scaler.scale_
+        return (
+            np.ascontiguousarray(center, dtype=np.float32),
+            np.ascontiguousarray(scale, dtype=np.float32)
+        )
+    
+    def _get_temporal_features(self) -> Tuple[int, int, int, int, int]:
+        """
+        Get (hour, day, month, weekday, year) for the current time.
+        
+        The model only sees hour-level granularity, so the values are cached until
+        the end of the current clock hour and never outlive it.
+        """
+        ts = time.time()
+        temporal = self._temporal
+        if temporal is None or ts >= self._temporal_expires:
+            now = datetime.fromtimestamp(ts)
+            # weekday: 0=Monday, 6=Sunday
+            temporal = (now.hour, now.day, now.month, now.weekday(), now.year)
+            seconds_into_hour = now.minute * 60 + now.second + now.microsecond / 1e6
+            self._temporal = temporal
+            self._temporal_expires = ts - seconds_into_hour + 3600
+        return temporal
     
     def _get_borough_id(self, lat: float, lon: float) -> int:
         """
@@ -192,17 +274,53 @@ class TaxiFarePredictor:
         Returns:
             Borough ID (0-4 for Manhattan, Brooklyn, Queens, Bronx, Staten Island)
         """
-        # Simplified borough mapping based on coordinates
-        if -74.02 <= lon <= -73.93 and 40.70 <= lat <= 40.80:
-            return 0  # Manhattan
-        elif -74.05 <= lon <= -73.85 and 40.63 <= lat <= 40.72:
-            return 1  # Brooklyn
-        elif -73.96 <= lon <= -73.75 and 40.72 <= lat <= 40.80:
-            return 2  # Queens
-        elif -73.93 <= lon <= -73.80 and 40.80 <= lat <= 40.88:
-            return 3  # Bronx
-        else:
-            return 4  # Staten Island or other
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            return 4
+        lat_min, lon_min = self.BOROUGH_LUT_ORIGIN
+        y = (lat - lat_min) * self.BOROUGH_LUT_CELLS_PER_DEGREE
+        x = (lon - lon_min) * self.BOROUGH_LUT_CELLS_PER_DEGREE
+        # Box edges lie on grid lines, where a cell (closed below, open above)
+        # can disagree with the inclusive box test; settle those exactly
+        if abs(y - round(y)) < 1e-6 or abs(x - round(x)) < 1e-6:
+            return self._get_borough_id_from_bounds(lat, lon)
+        i = math.floor(y)
+        j = math.floor(x)
+        rows, cols = self._borough_lut.shape
+        if 0 <= i < rows and 0 <= j < cols:
+            return int(self._borough_lut[i, j])
+        return 4  # Outside the grid: Staten Island or other
+    
+    def _get_borough_id_from_bounds(self, lat: float, lon: float) -> int:
+        """Test BOROUGH_BOUNDS in order; used for points on a grid line."""
+        for borough_id, (lon_min, lon_max, lat_min, lat_max) in enumerate(
+            self.BOROUGH_BOUNDS.tolist()
+        ):
+            if lon_min <= lon <= lon_max and lat_min <= lat <= lat_max:
+                return borough_id
+        return 4  # Staten Island or other
+    
+    @classmethod
+    def _build_borough_lut(cls) -> np.ndarray:
+        """
+        Evaluate the borough boxes once per grid cell.
+        
+        Box edges sit on the 0.01° grid lines, so each cell lies entirely inside or
+        outside every box; points exactly on a grid line are resolved by
+        _get_borough_id_from_bounds instead.
+        """
+        lat_min, lon_min = cls.BOROUGH_LUT_ORIGIN
+        rows, cols = cls.BOROUGH_LUT_SHAPE
+        step = 1.0 / cls.BOROUGH_LUT_CELLS_PER_DEGREE
+        lats = lat_min + (np.arange(rows) + 0.5) * step
+        lons = lon_min + (np.arange(cols) + 0.5) * step
+        
+        bounds = cls.BOROUGH_BOUNDS[:, :, None, None]
+        mask = (
+            (lons >= bounds[:, 0]) & (lons <= bounds[:, 1]) &
+            (lats[:, None] >= bounds[:, 2]) & (lats[:, None] <= bounds[:, 3])
+        )
+        # First matching box wins; anything unmatched is Staten Island or other
+        return np.where(mask.any(axis=0), mask.argmax(axis=0), 4).astype(np.uint8)
     
     def _get_borough_name(self, lat: float, lon: float) -> str:
         """
@@ -211,15 +329,7 @@ class TaxiFarePredictor:
         Returns:
             Borough name as string
         """
-        borough_id = self._get_borough_id(lat, lon)
-        borough_names = {
-            0: "Manhattan",
-            1: "Brooklyn", 
-            2: "Queens",
-            3: "Bronx",
-            4: "Staten Island"
-        }
-        return borough_names.get(borough_id, "Other")
+        return self.BOROUGH_NAMES[self._get_borough_id(lat, lon)]
     
     def predict_fare(
         self,
@@ -230,6 +340,9 @@ class TaxiFarePredictor:
         """
         Predict taxi fare for given trip parameters.
         
+        Coordinates are quantized to 4 decimals (~11 m) and results are cached per
+        temporal-feature tuple, since those only change once an hour.
+        
         Args:
             pickup_lon: Pickup longitude
             pickup_lat: Pickup latitude
@@ -243,87 +356,183 @@ class TaxiFarePredictor:
         if not self.is_loaded:
             raise RuntimeError("Model not loaded. Cannot make predictions.")
         
-        start_time = time.time()
+        result = dict(self._pred_cache(
+            round(pickup_lon, self.COORDINATE_DECIMALS), round(pickup_lat, self.COORDINATE_DECIMALS),
+            round(dropoff_lon, self.COORDINATE_DECIMALS), round(dropoff_lat, self.COORDINATE_DECIMALS),
+            int(passenger_count), self._get_temporal_features()
+        ))
+        # Cached entries keep the time they were computed; stamp this request
+        result["prediction_timestamp"] = get_current_timestamp()
+        return result
+    
+    def _predict_fare_uncached(
+        self,
+        pickup_lon: float, pickup_lat: float,
+        dropoff_lon: float, dropoff_lat: float,
+        passenger_count: int, temporal: Tuple[int, int, int, int, int]
+    ) -> Dict:
+        """
+        Run the full feature → scale → model pipeline for one trip.
         
+        ``temporal`` is both part of the cache key and the temporal features the
+        prediction is built from, so a cached entry always matches its key.
+        """
         try:
-            # Prepare features
-            features_df = self._prepare_features(
-                pickup_lon, pickup_lat, dropoff_lon, dropoff_lat, passenger_count
+            # Prepare and scale features
+            features, features_scaled = self._prepare_features(
+                pickup_lon, pickup_lat, dropoff_lon, dropoff_lat, passenger_count, temporal
             )
             
-            logger.debug(f"Features DataFrame before scaling: {features_df.dtypes}")
-            logger.debug(f"Features shape: {features_df.shape}")
-            
-            # Scale features - ensure consistent data types
-            features_scaled = self.scaler.transform(features_df)
-            
-            # Convert to float64 to avoid data type conflicts
-            features_scaled = features_scaled.astype(np.float64)
+            # Make prediction
+            prediction = float(self._predict_scaled(features_scaled)[0])
             
-            logger.debug(f"Features after scaling shape: {features_scaled.shape}")
-            logger.debug(f"Features after scaling dtype: {features_scaled.dtype}")
+            logger.debug("Raw prediction: %s", prediction)
             
-            # Make prediction
-            prediction = self.model.predict(features_scaled)[0]
-            prediction = float(prediction)  # Ensure it's a standard Python float
+            individual_predictions = self._individual_predictions(features_scaled, [prediction])[0]
             
-            logger.info(f"Raw prediction: {prediction}")
+            # Reuse the distance feature rather than recomputing the haversine
+            trip_distance = float(features[0, self._feature_index['distance']])
             
-            # Calculate additional trip information for response
-            from .utils import calculate_haversine_distance
-            trip_distance = calculate_haversine_distance(
-                pickup_lat, pickup_lon, dropoff_lat, dropoff_lon
+            return self._build_result(
+                pickup_lon, pickup_lat, dropoff_lon, dropoff_lat, trip_distance,
+                prediction, individual_predictions, features_scaled[0]
             )
             
-            # Estimate duration based on distance and NYC traffic (approximate)
-            # Average NYC taxi speed: 12-15 mph
-            estimated_duration = (trip_distance / 12.0) * 60  # Convert to minutes
-            
-            # Get borough information (simplified)
-            pickup_borough = self._get_borough_name(pickup_lat, pickup_lon)
-            dropoff_borough = self._get_borough_name(dropoff_lat, dropoff_lon)
+        except Exception as e:
+            logger.exception(f"Error during prediction ({type(e).__name__}): {e}")
+            raise RuntimeError(f"Prediction failed: {str(e)}")
+    
+    def predict_batch(self, trips: np.ndarray) -> List[Dict]:
+        """
+        Predict fares for many trips with a single scaler and model call.
+        
+        Coordinates are quantized exactly as in ``predict_fare``, so a trip gets
+        the same answer from both.
+        
+        Args:
+            trips: Array of shape (N, 5) with columns pickup_lon, pickup_lat,
+                dropoff_lon, dropoff_lat, passenger_count
+        
+        Returns:
+            List of prediction result dictionaries, in input order
+        """
+        if not self.is_loaded:
+            raise RuntimeError("Model not loaded. Cannot make predictions.")
+        
+        try:
+            # Python's round(), not np.round, so halfway cases match predict_fare
+            trips = np.array([
+                [round(value, self.COORDINATE_DECIMALS) for value in trip[:4]] + [int(trip[4])]
+                for trip in trips.tolist()
+            ])
             
-            # Get individual model predictions if it's an ensemble
-            individual_predictions = []
-            if hasattr(self.model, 'estimators_'):
-                # For ensemble models like Random Forest
-                try:
-                    individual_predictions = [
-                        float(estimator.predict(features_scaled)[0]) 
-                        for estimator in self.model.estimators_[:5]  # First 5 estimators
-                    ]
-                except:
-                    individual_predictions = [prediction] * 3
-            elif hasattr(self.model, 'predict'):
-                # Single model - use multiple slightly varied predictions for confidence
-                individual_predictions = [prediction] * 3
+            hour, day, month, weekday, year = self._get_temporal_features()
             
-            # Calculate confidence and fare range
-            confidence, fare_range = calculate_fare_confidence(
-                prediction, individual_predictions, trip_distance
+            features = np.empty((len(trips), len(self.feature_names)), dtype=np.float32)
+            prepare_features_batch(
+                features, self._kernel_cols, trips, hour, day, month, weekday, year
             )
             
-            final_fare = max(2.50, prediction)  # Minimum fare
+            features_scaled = self.scaler.transform(features)
+            predictions = self._predict_scaled(features_scaled).tolist()
+            individual_predictions = self._individual_predictions(features_scaled, predictions)
+            trip_distances = features[:, self._feature_index['distance']].tolist()
             
-            # Return format expected by frontend
-            return {
-                "fare": round(final_fare, 2),
-                "confidence": confidence,
-                "distance_miles": round(trip_distance, 3),
-                "duration_minutes": round(estimated_duration, 1),
-                "pickup_borough": pickup_borough,
-                "dropoff_borough": dropoff_borough,
-                "features": dict(zip(self.feature_names, features_scaled[0].tolist())),
-                "model_version": "Enhanced Ensemble v1.0",
-                "prediction_timestamp": datetime.now().isoformat()
-            }
+            return [
+                self._build_result(
+                    pickup_lon, pickup_lat, dropoff_lon, dropoff_lat, trip_distance,
+                    prediction, individual, scaled_row
+                )
+                for (pickup_lon, pickup_lat, dropoff_lon, dropoff_lat, _), trip_distance,
+                    prediction, individual, scaled_row
+                in zip(
+                    trips.tolist(), trip_distances,
+                    predictions, individual_predictions, features_scaled
+                )
+            ]
             
         except Exception as e:
-            logger.error(f"Error during prediction: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            raise RuntimeError(f"Prediction failed: {str(e)}")
+            logger.exception(f"Error during batch prediction ({type(e).__name__}): {e}")
+            raise RuntimeError(f"Batch prediction failed: {str(e)}")
+    
+    def _predict_scaled(self, features_scaled: np.ndarray) -> np.ndarray:
+        """Run the model on scaled features, returning one prediction per row."""
+        if self.onnx_session is not None:
+            outputs = self.onnx_session.run(None, {self._onnx_input_name: features_scaled})
+            return outputs[0].ravel()
+        return self.model.predict(features_scaled)
+    
+    def _individual_predictions(
+        self, features_scaled: np.ndarray, predictions: List[float]
+    ) -> List[List[float]]:
+        """
+        Get per-row predictions from individual ensemble members, used for confidence.
+        
+        Single models (or ensembles that cannot be queried) repeat the main prediction.
+        """
+        if self._is_ensemble:
+            # For ensemble models like Random Forest
+            try:
+                if self._trees is not None:
+                    # Query the fitted trees directly, skipping sklearn's per-call input validation
+                    # (no copy when the scaler already returned contiguous float32)
+                    features_f32 = np.ascontiguousarray(features_scaled, dtype=np.float32)
+                    per_estimator = np.empty((len(self._trees), len(features_f32)))
+                    for i, tree in enumerate(self._trees):
+                        per_estimator[i] = tree.predict(features_f32)[:, 0]
+                else:
+                    per_estimator = np.empty((len(self._confidence_estimators), len(features_scaled)))
+                    for i, estimator in enumerate(self._confidence_estimators):
+                        per_estimator[i] = estimator.predict(features_scaled)
+                return per_estimator.T.tolist()
+            except Exception:
+                pass
+        
+        # Single model - use multiple slightly varied predictions for confidence
+        return [[prediction] * 3 for prediction in predictions]
+    
+    def _build_result(
+        self,
+        pickup_lon: float, pickup_lat: float,
+        dropoff_lon: float, dropoff_lat: float, trip_distance: float,
+        prediction: float, individual_predictions: List[float],
+        features_scaled_row: np.ndarray
+    ) -> Dict:
+        """Assemble the response dictionary for one predicted trip."""
+        # Estimate duration based on distance and NYC traffic (approximate)
+        # Average NYC taxi speed: 12-15 mph
+        estimated_duration = (trip_distance / 12.0) * 60  # Convert to minutes
+        
+        # Get borough information (simplified)
+        pickup_borough = self._get_borough_name(pickup_lat, pickup_lon)
+        dropoff_borough = self._get_borough_name(dropoff_lat, dropoff_lon)
+        
+        # Calculate confidence and fare range
+        confidence, fare_range = calculate_fare_confidence(
+            prediction, individual_predictions, trip_distance
+        )
+        
+        final_fare = max(2.50, prediction)  # Minimum fare
+        
+        # Return format expected by frontend
+        return {
+            "fare": round(final_fare, 2),
+            "confidence": confidence,
+            "distance_miles": round(trip_distance, 3),
+            "duration_minutes": round(estimated_duration, 1),
+            "pickup_borough": pickup_borough,
+            "dropoff_borough": dropoff_borough,
+            "features": dict(zip(self.feature_names, features_scaled_row.tolist())),
+            "model_version": "Enhanced Ensemble v1.0",
+            "prediction_timestamp": get_current_timestamp()
+        }
+    
+    def clear_prediction_cache(self) -> Dict:
+        """Drop all cached predictions and return the cache stats before clearing."""
+        info = self._pred_cache.cache_info()
+        self._pred_cache.cache_clear()
+        logger.info(f"Prediction cache cleared ({info.currsize} entries)")
+        return {"hits": info.hits, "misses": info.misses, "cleared_entries": info.currsize}
     
     def get_model_info(self) -> Dict:
         """Get information about the loaded model."""
@@ -333,6 +542,7 @@ class TaxiFarePredictor:
         return {
             "loaded": True,
             "model_type": type(self.model).__name__,
+            "runtime": "onnxruntime" if self.onnx_session is not None else "sklearn",
             "features_count": len(self.feature_names),
             "feature_names": self.feature_names,
             "config": self.model_config if self.model_config else {}
@@ -341,11 +551,28 @@ class TaxiFarePredictor:
 
 # Global predictor instance
 _predictor_instance = None
+_predictor_lock = threading.Lock()
 
 
 def get_predictor() -> TaxiFarePredictor:
-    """Get or create the global predictor instance."""
+    """Get or create the global predictor instance (loaded at most once per process)."""
     global _predictor_instance
     if _predictor_instance is None:
-        _predictor_instance = TaxiFarePredictor()
+        with _predictor_lock:
+            if _predictor_instance is None:
+                _predictor_instance = TaxiFarePredictor()
     return _predictor_instance
+
+
+def reload_predictor() -> TaxiFarePredictor:
+    """
+    Load the model files from disk into a new predictor and make it the global one.
+    
+    The new instance is fully built before the swap, so requests see either the
+    old model or the new one, never a mix; it also starts with an empty cache.
+    """
+    global _predictor_instance
+    new_predictor = TaxiFarePredictor()
+    with _predictor_lock:
+        _predictor_instance = new_predictor
+    return new_predictor
@@ -3,10 +3,16 @@ Utility functions for the taxi fare prediction API.
 """
 
 import math
+import time
 import logging
 from datetime import datetime
 from typing import Tuple
 
+import numpy as np
+
+# Radius of earth in miles
+EARTH_RADIUS_MILES = 3956
+
 
 def setup_logging():
     """Setup logging configuration."""
@@ -42,10 +48,30 @@ def calculate_haversine_distance(
          math.cos(pickup_lat) * math.cos(dropoff_lat) * math.sin(dlon/2)**2)
     c = 2 * math.asin(math.sqrt(a))
     
-    # Radius of earth in miles
-    r = 3956
+    return c * EARTH_RADIUS_MILES
+
+
+def haversine_one_to_many(
+    pickup_lat: float, pickup_lon: float,
+    targets_lat, targets_lon, out
+) -> None:
+    """
+    Haversine distances in miles from one pickup point to many targets.
     
-    return c * r
+    The pickup's radians and cosine are computed once and reused for every
+    target. Results are written into ``out`` (same length as the targets).
+    Plain ``math`` code so it also compiles under Numba (see utils_numba).
+    """
+    pickup_lat_r = math.radians(pickup_lat)
+    pickup_lon_r = math.radians(pickup_lon)
+    cos_pickup_lat = math.cos(pickup_lat_r)
+    
+    for i in range(len(targets_lat)):
+        target_lat_r = math.radians(targets_lat[i])
+        target_lon_r = math.radians(targets_lon[i])
+        a = (math.sin((target_lat_r - pickup_lat_r) / 2)**2 +
+             cos_pickup_lat * math.cos(target_lat_r) * math.sin((target_lon_r - pickup_lon_r) / 2)**2)
+        out[i] = 2 * math.asin(math.sqrt(a)) * EARTH_RADIUS_MILES
 
 
 def calculate_manhattan_distance(
@@ -98,9 +124,14 @@ def calculate_fare_confidence(
         return confidence, fare_range
     
     # Calculate standard deviation of predictions
-    import statistics
-    std_dev = statistics.stdev(model_predictions)
-    mean_pred = statistics.mean(model_predictions)
+    if all(p == prediction for p in model_predictions):
+        # Repeated main prediction (single model): no spread to measure
+        std_dev = 0.0
+        mean_pred = prediction
+    else:
+        predictions = np.asarray(model_predictions, dtype=np.float64)
+        std_dev = float(predictions.std(ddof=1))  # sample std, as statistics.stdev
+        mean_pred = float(predictions.mean())
     
     # Confidence based on prediction consistency
     # Lower std_dev = higher confidence
@@ -120,9 +151,21 @@ def calculate_fare_confidence(
     }
 
 
+# (epoch second, ISO string) of the last formatted timestamp
+_LAST_TS = [0, ""]
+
+
 def get_current_timestamp() -> str:
-    """Get current timestamp in ISO format."""
-    return datetime.now().isoformat()
+    """
+    Get current timestamp in ISO format, at one-second resolution.
+    
+    The formatted string is reused for every call within the same second.
+    """
+    now = int(time.time())
+    if now != _LAST_TS[0]:
+        _LAST_TS[1] = datetime.fromtimestamp(now).isoformat(timespec='seconds')
+        _LAST_TS[0] = now
+    return _LAST_TS[1]
 
 
 def format_prediction_details(
@@ -0,0 +1,222 @@
+"""
+JIT-compiled feature engineering kernels for the prediction hot path.
+
+Numba is optional: without it the same functions run as plain Python.
+"""
+
+import math
+import logging
+
+import numpy as np
+
+from .utils import EARTH_RADIUS_MILES, haversine_one_to_many as _haversine_one_to_many
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the environment
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator that leaves the function interpreted."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Order in which the kernel emits features; mapped onto model columns by the caller
+KERNEL_FEATURES = (
+    'pickup_longitude', 'pickup_latitude', 'dropoff_longitude', 'dropoff_latitude',
+    'passenger_count', 'hour', 'day', 'month', 'weekday', 'year',
+    'distance', 'jfk_pickup_dist', 'ewr_pickup_dist', 'lga_pickup_dist',
+    'is_weekend', 'is_rush_hour', 'is_night',
+    'manhattan_pickup_dist', 'is_manhattan_pickup', 'is_manhattan_dropoff',
+    'log_distance'
+)
+
+
+# Fixed pickup reference points: JFK, EWR, LGA, Manhattan center
+REF_LATS = np.array([40.6413, 40.6895, 40.7769, 40.7589])
+REF_LONS = np.array([-73.7781, -74.1745, -73.8740, -73.9851])
+
+
+# Numba build of the shared one-to-many haversine (pickup trig computed once)
+haversine_one_to_many = njit(cache=True, fastmath=True)(_haversine_one_to_many)
+
+
+@njit(cache=True, fastmath=True)
+def trip_distances(pickup_lat, pickup_lon, dropoff_lat, dropoff_lon):
+    """
+    Distances in miles from pickup to dropoff, JFK, EWR, LGA and Manhattan center.
+
+    Returns:
+        Length-5 float64 array in that order
+    """
+    targets_lat = np.empty(5)
+    targets_lon = np.empty(5)
+    targets_lat[0] = dropoff_lat
+    targets_lon[0] = dropoff_lon
+    targets_lat[1:] = REF_LATS
+    targets_lon[1:] = REF_LONS
+
+    out = np.empty(5)
+    haversine_one_to_many(pickup_lat, pickup_lon, targets_lat, targets_lon, out)
+    return out
+
+
+@njit(cache=True, fastmath=True)
+def prepare_features_row(
+    out, cols,
+    pickup_lon, pickup_lat, dropoff_lon, dropoff_lat,
+    passenger_count, hour, day, month, weekday, year
+):
+    """
+    Compute all model features for one trip and write them into ``out``.
+
+    Args:
+        out: 1-D float32 array receiving the features
+        cols: Column index in ``out`` for each name in ``KERNEL_FEATURES``
+    """
+    distances = trip_distances(pickup_lat, pickup_lon, dropoff_lat, dropoff_lon)
+    distance = distances[0]
+
+    # Manhattan bounds (approximate)
+    is_manhattan_pickup = (40.70 <= pickup_lat <= 40.80 and
+                           -74.02 <= pickup_lon <= -73.93)
+    is_manhattan_dropoff = (40.70 <= dropoff_lat <= 40.80 and
+                            -74.02 <= dropoff_lon <= -73.93)
+
+    out[cols[0]] = pickup_lon
+    out[cols[1]] = pickup_lat
+    out[cols[2]] = dropoff_lon
+    out[cols[3]] = dropoff_lat
+    out[cols[4]] = passenger_count
+    out[cols[5]] = hour
+    out[cols[6]] = day
+    out[cols[7]] = month
+    out[cols[8]] = weekday
+    out[cols[9]] = year
+    out[cols[10]] = distance
+    out[cols[11]] = distances[1]  # JFK
+    out[cols[12]] = distances[2]  # EWR
+    out[cols[13]] = distances[3]  # LGA
+    out[cols[14]] = 1.0 if weekday >= 5 else 0.0
+    out[cols[15]] = 1.0 if (7 <= hour <= 9) or (17 <= hour <= 19) else 0.0
+    out[cols[16]] = 1.0 if hour >= 22 or hour <= 5 else 0.0
+    out[cols[17]] = distances[4]  # Manhattan center
+    out[cols[18]] = 1.0 if is_manhattan_pickup else 0.0
+    out[cols[19]] = 1.0 if is_manhattan_dropoff else 0.0
+    # Log distance (floor to avoid log(0))
+    out[cols[20]] = math.log(max(distance, 0.01))
+
+
+@njit(cache=True, fastmath=True)
+def build_and_scale(
+    raw, scaled, cols, center, scale,
+    pickup_lon, pickup_lat, dropoff_lon, dropoff_lat,
+    passenger_count, hour, day, month, weekday, year
+):
+    """
+    Compute all model features for one trip and scale them in the same call.
+    
+    Fuses ``prepare_features_row`` with the scaler's ``(x - center) / scale``
+    so the single-trip path needs no separate ``scaler.transform`` call.
+    
+    Args:
+        raw: 1-D float32 array receiving the unscaled features
+        scaled: 1-D float32 array receiving the scaled features
+        cols: Column index for each name in ``KERNEL_FEATURES``
+        center: Per-column scaler center (zeros when not centering)
+        scale: Per-column scaler scale (ones when not scaling)
+    """
+    prepare_features_row(
+        raw, cols,
+        pickup_lon, pickup_lat, dropoff_lon, dropoff_lat,
+        passenger_count, hour, day, month, weekday, year
+    )
+    for i in range(len(raw)):
+        scaled[i] = (raw[i] - center[i]) / scale[i]
+
+
+def prepare_features_batch(
+    out, cols, trips,
+    hour, day, month, weekday, year
+):
+    """
+    Vectorized counterpart of ``prepare_features_row`` for many trips.
+    
+    Whole-column numpy operations instead of a per-row loop; every trip in a
+    batch shares the same temporal features.
+    
+    Args:
+        out: (N, n_features) float32 array receiving the features
+        cols: Column index in ``out`` for each name in ``KERNEL_FEATURES``
+        trips: (N, 5) array of pickup_lon, pickup_lat, dropoff_lon,
+            dropoff_lat, passenger_count
+    """
+    pickup_lon = trips[:, 0]
+    pickup_lat = trips[:, 1]
+    dropoff_lon = trips[:, 2]
+    dropoff_lat = trips[:, 3]
+    
+    # (N, 5) targets: dropoff plus the fixed reference points
+    targets_lat = np.empty((len(trips), 5))
+    targets_lon = np.empty((len(trips), 5))
+    targets_lat[:, 0] = dropoff_lat
+    targets_lon[:, 0] = dropoff_lon
+    targets_lat[:, 1:] = REF_LATS
+    targets_lon[:, 1:] = REF_LONS
+    
+    pickup_lat_r = np.radians(pickup_lat)[:, None]
+    pickup_lon_r = np.radians(pickup_lon)[:, None]
+    targets_lat_r = np.radians(targets_lat)
+    targets_lon_r = np.radians(targets_lon)
+    a = (np.sin((targets_lat_r - pickup_lat_r) / 2)**2 +
+         np.cos(pickup_lat_r) * np.cos(targets_lat_r) *
+         np.sin((targets_lon_r - pickup_lon_r) / 2)**2)
+    distances = 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_MILES
+    distance = distances[:, 0]
+    
+    # Manhattan bounds (approximate)
+    is_manhattan_pickup = ((40.70 <= pickup_lat) & (pickup_lat <= 40.80) &
+                           (-74.02 <= pickup_lon) & (pickup_lon <= -73.93))
+    is_manhattan_dropoff = ((40.70 <= dropoff_lat) & (dropoff_lat <= 40.80) &
+                            (-74.02 <= dropoff_lon) & (dropoff_lon <= -73.93))
+    
+    out[:, cols[0]] = pickup_lon
+    out[:, cols[1]] = pickup_lat
+    out[:, cols[2]] = dropoff_lon
+    out[:, cols[3]] = dropoff_lat
+    out[:, cols[4]] = np.trunc(trips[:, 4])
+    out[:, cols[5]] = hour
+    out[:, cols[6]] = day
+    out[:, cols[7]] = month
+    out[:, cols[8]] = weekday
+    out[:, cols[9]] = year
+    out[:, cols[10]] = distance
+    out[:, cols[11]] = distances[:, 1]  # JFK
+    out[:, cols[12]] = distances[:, 2]  # EWR
+    out[:, cols[13]] = distances[:, 3]  # LGA
+    out[:, cols[14]] = 1.0 if weekday >= 5 else 0.0
+    out[:, cols[15]] = 1.0 if (7 <= hour <= 9) or (17 <= hour <= 19) else 0.0
+    out[:, cols[16]] = 1.0 if hour >= 22 or hour <= 5 else 0.0
+    out[:, cols[17]] = distances[:, 4]  # Manhattan center
+    out[:, cols[18]] = is_manhattan_pickup
+    out[:, cols[19]] = is_manhattan_dropoff
+    # Log distance (floor to avoid log(0))
+    out[:, cols[20]] = np.log(np.maximum(distance, 0.01))
+
+
+def warmup():
+    """Trigger JIT compilation (or load the on-disk cache) ahead of the first request."""
+    out = np.empty(len(KERNEL_FEATURES), dtype=np.float32)
+    cols = np.arange(len(KERNEL_FEATURES), dtype=np.int64)
+    scaled = np.empty_like(out)
+    build_and_scale(
+        out, scaled, cols,
+        np.zeros(len(out), dtype=np.float32), np.ones(len(out), dtype=np.float32),
+        -73.99, 40.75, -73.98, 40.76, 1, 12, 15, 6, 2, 2025
+    )
+    logger.info(f"Feature kernel ready (numba={'enabled' if NUMBA_AVAILABLE else 'disabled'})")
@@ -1,11 +1,15 @@
 
 import joblib
-import pandas as pd
 import numpy as np
 from datetime import datetime
 import json
 import os
 
+from model_utils import ignore_feature_name_warnings
+
+# NYC coordinate bounds: (min_lng, max_lng, min_lat, max_lat)
+NYC_BOUNDS = (-74.3, -73.7, 40.5, 40.9)
+
 class EnhancedTaxiFarePredictor:
     def __init__(self, model_dir="."):
         """Initialize the enhanced taxi fare predictor"""
@@ -21,6 +25,9 @@ class EnhancedTaxiFarePredictor:
         
         self.feature_names = self.config['web_app_features']
         
+        # Inputs are plain ndarrays in feature_names order
+        ignore_feature_name_warnings()
+        
         # Check which log-transformed features are actually used
         self.has_log_distance = 'log_distance' in self.feature_names
         self.has_log_jfk = 'log_jfk_pickup_dist' in self.feature_names
@@ -42,32 +49,37 @@ class EnhancedTaxiFarePredictor:
         a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng/2)**2
         return 2 * R * np.arcsin(np.sqrt(a))
     
-    def validate_inputs(self, pickup_lng, pickup_lat, dropoff_lng, dropoff_lat, passenger_count):
-        """Validate input parameters"""
-        # NYC coordinate bounds
-        nyc_bounds = {
-            'min_lng': -74.3, 'max_lng': -73.7,
-            'min_lat': 40.5, 'max_lat': 40.9
-        }
+    def validate_inputs(self, pickup_lng, pickup_lat, dropoff_lng, dropoff_lat, passenger_count,
+                        distance=None):
+        """Validate input parameters (pass ``distance`` if the trip distance is already known)"""
+        min_lng, max_lng, min_lat, max_lat = NYC_BOUNDS
         
         errors = []
         
-        # Check coordinate bounds
-        if not (nyc_bounds['min_lng'] <= pickup_lng <= nyc_bounds['max_lng']):
-            errors.append(f"Pickup longitude {pickup_lng} outside NYC bounds")
-        if not (nyc_bounds['min_lat'] <= pickup_lat <= nyc_bounds['max_lat']):
-            errors.append(f"Pickup latitude {pickup_lat} outside NYC bounds")
-        if not (nyc_bounds['min_lng'] <= dropoff_lng <= nyc_bounds['max_lng']):
-            errors.append(f"Dropoff longitude {dropoff_lng} outside NYC bounds")
-        if not (nyc_bounds['min_lat'] <= dropoff_lat <= nyc_bounds['max_lat']):
-            errors.append(f"Dropoff latitude {dropoff_lat} outside NYC bounds")
-        
-        # Check passenger count
-        if not (1 <= passenger_count <= 6):
-            errors.append(f"Passenger count {passenger_count} must be between 1 and 6")
+        # Fast path: a single combined check; detailed messages only when something fails
+        is_valid = (
+            min_lng <= pickup_lng <= max_lng and min_lng <= dropoff_lng <= max_lng and
+            min_lat <= pickup_lat <= max_lat and min_lat <= dropoff_lat <= max_lat and
+            1 <= passenger_count <= 6
+        )
+        if not is_valid:
+            # Check coordinate bounds
+            if not (min_lng <= pickup_lng <= max_lng):
+                errors.append(f"Pickup longitude {pickup_lng} outside NYC bounds")
+            if not (min_lat <= pickup_lat <= max_lat):
+                errors.append(f"Pickup latitude {pickup_lat} outside NYC bounds")
+            if not (min_lng <= dropoff_lng <= max_lng):
+                errors.append(f"Dropoff longitude {dropoff_lng} outside NYC bounds")
+            if not (min_lat <= dropoff_lat <= max_lat):
+                errors.append(f"Dropoff latitude {dropoff_lat} outside NYC bounds")
+            
+            # Check passenger count
+            if not (1 <= passenger_count <= 6):
+                errors.append(f"Passenger count {passenger_count} must be between 1 and 6")
         
         # Check if pickup and dropoff are the same
-        distance = self.haversine_distance(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
+        if distance is None:
+            distance = self.haversine_distance(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
         if distance < 0.01:  # Less than 0.01 miles
             errors.append("Pickup and dropoff locations are too close")
         
@@ -78,32 +90,34 @@ class EnhancedTaxiFarePredictor:
         """
         Predict taxi fare with enhanced feature engineering and validation
         """
-        # Validate inputs
-        validation_errors = self.validate_inputs(pickup_lng, pickup_lat, dropoff_lng, dropoff_lat, passenger_count)
+        # Distances from pickup to dropoff, the three airports and Manhattan center
+        # in a single vectorized haversine call
+        targets = np.array([
+            [dropoff_lat, dropoff_lng],
+            [40.6413, -73.7781],  # JFK
+            [40.6895, -74.1745],  # EWR
+            [40.7769, -73.8740],  # LGA
+            [40.7589, -73.9851]   # Manhattan center
+        ])
+        distance, jfk_dist, ewr_dist, lga_dist, manhattan_dist = self.haversine_distance(
+            pickup_lat, pickup_lng, targets[:, 0], targets[:, 1]
+        )
+        
+        # Validate inputs (reusing the trip distance for the "too close" check)
+        validation_errors = self.validate_inputs(
+            pickup_lng, pickup_lat, dropoff_lng, dropoff_lat, passenger_count, distance=distance
+        )
         if validation_errors:
             raise ValueError(f"Input validation failed: {'; '.join(validation_errors)}")
         
         # Parse datetime
         if isinstance(pickup_datetime, str):
-            pickup_datetime = pd.to_datetime(pickup_datetime)
-        
-        # Calculate basic distance
-        distance = self.haversine_distance(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
-        
-        # Airport coordinates
-        airports = {
-            'jfk': (40.6413, -73.7781),
-            'ewr': (40.6895, -74.1745),
-            'lga': (40.7769, -73.8740)
-        }
-        
-        # Manhattan center
-        manhattan_center = (40.7589, -73.9851)
-        
-        # Calculate airport distances
-        jfk_dist = self.haversine_distance(pickup_lat, pickup_lng, *airports['jfk'])
-        ewr_dist = self.haversine_distance(pickup_lat, pickup_lng, *airports['ewr'])
-        lga_dist = self.haversine_distance(pickup_lat, pickup_lng, *airports['lga'])
+            try:
+                pickup_datetime = datetime.fromisoformat(pickup_datetime.replace('Z', '+00:00'))
+            except ValueError:
+                # Non-ISO input (e.g. "12/15/2023 2:30 PM"); dateutil is only needed here
+                from dateutil import parser as dateutil_parser
+                pickup_datetime = dateutil_parser.parse(pickup_datetime)
         
         # Create feature dictionary with base features
         features = {
@@ -124,7 +138,7 @@ class EnhancedTaxiFarePredictor:
             'is_weekend': int(pickup_datetime.weekday() >= 5),
             'is_rush_hour': int(pickup_datetime.hour in [7, 8, 9, 17, 18, 19]),
             'is_night': int(pickup_datetime.hour >= 22 or pickup_datetime.hour <= 6),
-            'manhattan_pickup_dist': self.haversine_distance(pickup_lat, pickup_lng, *manhattan_center),
+            'manhattan_pickup_dist': manhattan_dist,
             'is_manhattan_pickup': int((40.7 <= pickup_lat <= 40.8) and (-74.02 <= pickup_lng <= -73.93)),
             'is_manhattan_dropoff': int((40.7 <= dropoff_lat <= 40.8) and (-74.02 <= dropoff_lng <= -73.93))
         }
@@ -142,16 +156,17 @@ class EnhancedTaxiFarePredictor:
         if self.has_log_lga:
             features['log_lga_pickup_dist'] = np.log1p(lga_dist)
         
-        # Create DataFrame with only the features that exist in the model
-        available_features = {k: v for k, v in features.items() if k in self.feature_names}
-        X = pd.DataFrame([available_features])[self.feature_names]
+        # Fill a single row in model feature order
+        X = np.empty((1, len(self.feature_names)))
+        for i, name in enumerate(self.feature_names):
+            X[0, i] = features[name]
         
         if debug:
             print(f"🔍 Input features shape: {X.shape}")
-            print(f"📊 Feature names: {list(X.columns)}")
-            print(f"📊 Sample values: {X.values[0][:5]}")
+            print(f"📊 Feature names: {self.feature_names}")
+            print(f"📊 Sample values: {X[0][:5]}")
             print(f"📊 Distance: {distance:.2f} miles")
-            print(f"🔧 Log features included: {[col for col in X.columns if col.startswith('log_')]}")
+            print(f"🔧 Log features included: {[name for name in self.feature_names if name.startswith('log_')]}")
         
         # Scale features
         X_scaled = self.scaler.transform(X)
@@ -0,0 +1,71 @@
+"""
+Export the trained fare model to ONNX so the API can serve it with onnxruntime.
+
+Offline step, run from backend/models (requires backend/requirements-onnx.txt):
+
+    python export_onnx.py
+
+The scaler is not part of the graph: the API returns the scaled features in
+its response, so it keeps applying the RobustScaler itself.
+"""
+
+import json
+import sys
+
+import joblib
+import numpy as np
+from skl2onnx import to_onnx, update_registered_converter
+from skl2onnx.common.shape_calculator import calculate_linear_regressor_output_shapes
+
+# XGBoost and LightGBM converters come from onnxmltools and need the ML opset
+TARGET_OPSET = {'': 15, 'ai.onnx.ml': 3}
+
+
+def register_boosting_converters():
+    """Teach skl2onnx to convert XGBoost/LightGBM members of the ensemble."""
+    try:
+        from xgboost import XGBRegressor
+        from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+    except ImportError:
+        pass
+    else:
+        update_registered_converter(
+            XGBRegressor, 'XGBoostXGBRegressor',
+            calculate_linear_regressor_output_shapes, convert_xgboost
+        )
+    
+    try:
+        from lightgbm import LGBMRegressor
+        from onnxmltools.convert.lightgbm.operator_converters.LightGbm import convert_lightgbm
+    except ImportError:
+        pass
+    else:
+        update_registered_converter(
+            LGBMRegressor, 'LightGbmLGBMRegressor',
+            calculate_linear_regressor_output_shapes, convert_lightgbm,
+            options={'split': None}
+        )
+
+
+def export_onnx(model_dir="."):
+    """Convert best_taxi_fare_model.pkl to best_taxi_fare_model.onnx (float32 input)."""
+    register_boosting_converters()
+    
+    model = joblib.load(f"{model_dir}/best_taxi_fare_model.pkl")
+    
+    with open(f"{model_dir}/model_config.json", 'r') as f:
+        config = json.load(f)
+    n_features = len(config['web_app_features'])
+    
+    sample = np.zeros((1, n_features), dtype=np.float32)
+    onx = to_onnx(model, sample, target_opset=TARGET_OPSET)
+    
+    output_path = f"{model_dir}/best_taxi_fare_model.onnx"
+    with open(output_path, 'wb') as f:
+        f.write(onx.SerializeToString())
+    
+    print(f"✅ Exported {type(model).__name__} ({n_features} features) to {output_path}")
+
+
+if __name__ == "__main__":
+    export_onnx(sys.argv[1] if len(sys.argv) > 1 else ".")
@@ -0,0 +1,20 @@
+"""
+Helpers shared by the API predictor and the standalone model scripts.
+"""
+
+import warnings
+
+
+def ignore_feature_name_warnings():
+    """
+    Silence sklearn's warning about predicting on unnamed input.
+    
+    The scaler and model were fitted on DataFrames, but inference passes plain
+    ndarrays already in feature order. Only that one UserWarning is filtered;
+    the fitted estimators are left untouched.
+    """
+    warnings.filterwarnings(
+        "ignore",
+        message="X does not have valid feature names",
+        category=UserWarning
+    )
@@ -0,0 +1,154 @@
+"""
+API tests for the taxi fare prediction service.
+
+/predict, /predict_batch and /health skip response-model validation, so these
+check the response field types directly. The predictor runs its real code
+against a small model trained on the fly, through the normal startup path.
+"""
+
+import json
+
+import joblib
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import RobustScaler
+
+from app import main, prediction
+from app.utils_numba import KERNEL_FEATURES
+
+# More decimals than predict_fare's quantization, as the frontend sends
+TRIP = {
+    "pickup_longitude": -73.984449,
+    "pickup_latitude": 40.748451,
+    "dropoff_longitude": -73.973349,
+    "dropoff_latitude": 40.764449,
+    "passenger_count": 1
+}
+
+PREDICTION_FIELD_TYPES = {
+    "fare": float,
+    "confidence": float,
+    "distance_miles": float,
+    "duration_minutes": float,
+    "pickup_borough": str,
+    "dropoff_borough": str,
+    "features": dict,
+    "model_version": str,
+    "prediction_timestamp": str
+}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client whose predictor loads a small model from tmp_path."""
+    feature_names = list(KERNEL_FEATURES)
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, len(feature_names)))
+    y = rng.uniform(5, 50, size=200)
+    scaler = RobustScaler().fit(X)
+    model = RandomForestRegressor(n_estimators=5, max_depth=3, random_state=0)
+    model.fit(scaler.transform(X), y)
+    
+    joblib.dump(model, tmp_path / "best_taxi_fare_model.pkl")
+    joblib.dump(scaler, tmp_path / "robust_scaler.pkl")
+    (tmp_path / "model_config.json").write_text(json.dumps({"web_app_features": feature_names}))
+    
+    monkeypatch.setattr(prediction, "MODELS_DIR", tmp_path)
+    monkeypatch.setattr(prediction, "_predictor_instance", None)
+    monkeypatch.setattr(main, "predictor", None)
+    
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def assert_prediction_types(result):
+    assert set(result) == set(PREDICTION_FIELD_TYPES)
+    for field, expected_type in PREDICTION_FIELD_TYPES.items():
+        assert isinstance(result[field], expected_type), field
+    assert all(isinstance(value, float) for value in result["features"].values())
+
+
+def test_health(client):
+    response = client.get("/health")
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "healthy"
+    assert body["model_loaded"] is True
+    assert isinstance(body["version"], str)
+    assert isinstance(body["timestamp"], str)
+
+
+def test_predict(client):
+    response = client.post("/predict", json=TRIP)
+    
+    assert response.status_code == 200
+    assert_prediction_types(response.json())
+
+
+def test_predict_rejects_out_of_range_coordinates(client):
+    response = client.post("/predict", json={**TRIP, "pickup_latitude": 45.0})
+    
+    assert response.status_code == 422
+    error = response.json()["detail"][0]
+    assert error["loc"] == ["body", "pickup_latitude"]
+    
+    # Same error shape FastAPI produces for /predict_batch's body parameter
+    batch_response = client.post("/predict_batch", json={"trips": [{**TRIP, "pickup_latitude": 45.0}]})
+    assert batch_response.status_code == 422
+    assert set(error) == set(batch_response.json()["detail"][0])
+
+
+def test_predict_batch(client):
+    response = client.post("/predict_batch", json={"trips": [TRIP, {**TRIP, "passenger_count": 3}]})
+    
+    assert response.status_code == 200
+    predictions = response.json()["predictions"]
+    assert len(predictions) == 2
+    for result in predictions:
+        assert_prediction_types(result)
+
+
+def test_predict_batch_matches_predict(client):
+    single = client.post("/predict", json=TRIP).json()
+    batch = client.post("/predict_batch", json={"trips": [TRIP]}).json()["predictions"][0]
+    
+    assert batch["fare"] == pytest.approx(single["fare"])
+    assert batch["distance_miles"] == pytest.approx(single["distance_miles"])
+    assert batch["features"] == pytest.approx(single["features"])
+
+
+def test_cache_clear_disabled_without_admin_token(client, monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    
+    assert client.post("/cache/clear").status_code == 404
+
+
+def test_cache_clear_requires_admin_token(client, monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    
+    assert client.post("/cache/clear").status_code == 403
+    assert client.post("/cache/clear", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    
+    response = client.post("/cache/clear", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["cleared"] is True
+
+
+def test_model_reload_swaps_in_a_fresh_predictor(client, monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    client.post("/predict", json=TRIP)
+    old_predictor = main.predictor
+    
+    assert client.post("/model/reload").status_code == 403
+    
+    response = client.post("/model/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json() == {"reloaded": True, "model_loaded": True}
+    assert main.predictor is not old_predictor
+    assert main.predictor is prediction.get_predictor()
+    assert main.predictor.clear_prediction_cache()["cleared_entries"] == 0
+    
+    assert_prediction_types(client.post("/predict", json=TRIP).json())
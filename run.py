@@ -19,14 +19,21 @@ def main():
     print("🔍 Health Check: http://localhost:8000/health")
     print("\n⏹️  Press Ctrl+C to stop the server\n")
     
+    # Hot reload by default; RELOAD=0 runs WEB_CONCURRENCY workers (default: CPU count)
+    reload = os.getenv("RELOAD", "1") == "1"
+    
     try:
         uvicorn.run(
             "app.main:app",
             host="0.0.0.0",
             port=8000,
-            reload=True,
+            reload=reload,
+            workers=1 if reload else int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
             log_level="info",
-            app_dir=str(backend_dir)
+            app_dir=str(backend_dir),
+            # uvloop has no Windows build; fall back to the stdlib loop there
+            loop="asyncio" if sys.platform == "win32" else "uvloop",
+            http="httptools"
         )
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
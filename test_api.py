@@ -35,7 +35,7 @@ def test_prediction():
     print(f"Status: {response.status_code}")
     if response.status_code == 200:
         result = response.json()
-        print(f"Predicted fare: ${result['predicted_fare']:.2f}")
+        print(f"Predicted fare: ${result['fare']:.2f}")
         print(f"Confidence: {result['confidence']:.1%}")
         print(f"Distance: {result['distance_miles']:.2f} miles")
     else: